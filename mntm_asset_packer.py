@@ -6,8 +6,12 @@ more info here: https://github.com/notnotnescap/mntm-asset-packer
 This is a modification of the original asset_packer script by @Willy-JL
 """
 
+import concurrent.futures
+import contextlib
+import hashlib
 import importlib.metadata
 import io
+import mmap
 import os
 import pathlib
 import re
@@ -19,7 +23,8 @@ import typing
 from pathlib import Path
 
 import heatshrink2
-from PIL import Image, ImageOps
+import numpy as np
+from PIL import Image
 
 HELP_MESSAGE = """The asset packer converts animations with a specific structure to be \
 efficient and compatible with the asset pack system used in Momentum.
@@ -41,6 +46,9 @@ Usage :
     \033[32mmntm-asset-packer \033[0;33;1mpack all\033[0m
         \033[3mPacks all asset packs in the current directory into './asset_packs/'
         \033[0m
+    \033[32mmntm-asset-packer \033[0;33;1mpack <./path/to/AssetPack | all> --force\033[0m
+        \033[3mRepacks everything instead of reusing frames and icons that are already up to date in './asset_packs/'
+        \033[0m
     \033[32mpython3 mntm-asset-packer.py\033[0m
         \033[3mSame as 'mntm-asset-packer pack all'
         \033[0m
@@ -93,30 +101,66 @@ except importlib.metadata.PackageNotFoundError:
     # instead of using the python package
 
 
+FRAME_NAME_RE = re.compile(r"frame_\d+\.(png|bm)")
+PNG_FRAME_NAME_RE = re.compile(r"frame_\d+\.png")
+BM_FRAME_NAME_RE = re.compile(r"frame_\d+\.bm")
+HAS_DIGITS_RE = re.compile(r"\d+")
+MANIFEST_NAME_RE = re.compile(rb"Name: (.*)")
+PACK_NAME_RE = re.compile(r"^[a-zA-Z0-9_\- ]+$")
+# a line of a u8g2 font source holding exactly one string literal
+FONT_STRING_RE = re.compile(rb'[^"\r\n]*"([^"\r\n]*)"[^"\r\n]*')
+FONT_STRING_LINE_RE = re.compile(rb"(?<![^\r\n])" + FONT_STRING_RE.pattern + rb"(?![^\r\n])")
+META_WIDTH_RE = re.compile(rb"^Width:\s*(\d+)", re.MULTILINE)
+META_HEIGHT_RE = re.compile(rb"^Height:\s*(\d+)", re.MULTILINE)
+
+# compiled bitmaps are cached by png content, bump the version when the bitmap format changes
+BM_CACHE_DIR = pathlib.Path(".asset_packer_cache") / "bm-v1"
+bm_memory_cache: dict[str, bytes] = {}
+# below this many pixels to convert (about a second of work), starting worker processes costs more than it saves
+PARALLEL_MIN_PIXELS = 4096 * 128 * 64
+
+
+def bitmap_pixels(img: Image.Image) -> np.ndarray:
+    """Returns the pixels of an image as 1 for black and 0 for white."""
+    gray = np.asarray(img.convert("L"))
+    # dithering does nothing on pure black and white images, so a threshold gives the same result
+    if np.all((gray == 0) | (gray == 255)):
+        return (gray < 128).astype(np.uint8)
+    return np.asarray(img.convert("1"), dtype=np.uint8) ^ 1
+
+
+def pack_bitmap(img: Image.Image) -> bytes:
+    """Converts an image to uncompressed bitmap data."""
+    # rows padded to whole bytes, LSB first (same layout as XBM)
+    return np.packbits(bitmap_pixels(img), axis=1, bitorder="little").tobytes()
+
+
 def convert_to_bm(img: "Image.Image | pathlib.Path") -> bytes:
     """Converts an image to a bitmap."""
     if not isinstance(img, Image.Image):
         img = Image.open(img)
 
-    with io.BytesIO() as output:
-        img = img.convert("1")
-        img = ImageOps.invert(img)
-        img.save(output, format="XBM")
-        xbm = output.getvalue()
+    return compress_bitmap(pack_bitmap(img))
 
-    f = io.StringIO(xbm.decode().strip())
-    data = f.read().strip().replace("\n", "").replace(" ", "").split("=")[1][:-1]
-    data_str = data[1:-1].replace(",", " ").replace("0x", "")
-    data_bin = bytearray.fromhex(data_str)
 
-    # compressing the image
-    data_encoded_str = heatshrink2.compress(data_bin, window_sz2=8, lookahead_sz2=4)
-    data_enc = bytearray(data_encoded_str)
-    data_enc = bytearray([len(data_enc) & 0xFF, len(data_enc) >> 8]) + data_enc
+def convert_frames_to_bm(imgs: "list[Image.Image]") -> list[bytes]:
+    """Converts images of the same size to bitmaps, packing all of them at once."""
+    pixels = np.stack([bitmap_pixels(img) for img in imgs])
+    packed = np.packbits(pixels, axis=2, bitorder="little")
+    return [compress_bitmap(frame.tobytes()) for frame in packed]
+
 
-    # marking the image as compressed
-    if len(data_enc) + 2 < len(data_bin) + 1:
-        return b"\x01\x00" + data_enc
+def compress_bitmap(data_bin: bytes) -> bytes:
+    """Compresses packed bitmap data if it makes it smaller and adds the bitmap header."""
+    # compressing the image
+    data_enc = heatshrink2.compress(data_bin, window_sz2=8, lookahead_sz2=4)
+
+    # marking the image as compressed, followed by the compressed size
+    if len(data_enc) + 4 < len(data_bin) + 1:
+        bm = bytearray(4 + len(data_enc))
+        struct.pack_into("<BBH", bm, 0, 1, 0, len(data_enc))
+        bm[4:] = data_enc
+        return bytes(bm)
     return b"\x00" + data_bin
 
 
@@ -144,22 +188,13 @@ def recover_from_bm(bm: "bytes | pathlib.Path", width: int, height: int) -> Imag
     else:
         data_dec = bm[1:]
 
-    img = Image.new("1", (width, height))
+    # rows are padded to whole bytes, missing data is left black like the original putdata
+    row_bytes = (width + 7) // 8
+    data = np.frombuffer(data_dec, dtype=np.uint8)[: row_bytes * height]
+    data = np.pad(data, (0, row_bytes * height - data.size), constant_values=0xFF)
 
-    pixels = []
-    num_target_pixels = width * height
-    for byte_val in data_dec:
-        for i in range(8):
-            if len(pixels) < num_target_pixels:
-                pixels.append(1 - ((byte_val >> i) & 1))
-            else:
-                break
-        if len(pixels) >= num_target_pixels:
-            break
-
-    img.putdata(pixels)
-
-    return img
+    pixels = np.unpackbits(data, bitorder="little").reshape(height, -1)[:, :width] ^ 1
+    return Image.frombytes("1", (width, height), np.packbits(pixels, axis=1).tobytes())
 
 
 def recover_from_bmx(bmx: "bytes | pathlib.Path") -> Image.Image:
@@ -171,17 +206,201 @@ def recover_from_bmx(bmx: "bytes | pathlib.Path") -> Image.Image:
     return recover_from_bm(bmx[8:], width, height)
 
 
+def bm_cache_key(png: bytes) -> str:
+    """Returns the cache key for the given png content."""
+    return hashlib.blake2b(png, digest_size=16).hexdigest()
+
+
+def bm_cache_get(png: bytes) -> "bytes | None":
+    """Returns the cached bitmap for the given png content, if any."""
+    key = bm_cache_key(png)
+    if key in bm_memory_cache:
+        return bm_memory_cache[key]
+    try:
+        bm = (BM_CACHE_DIR / key).read_bytes()
+    except OSError:
+        return None
+    bm_memory_cache[key] = bm
+    return bm
+
+
+def bm_cache_put(png: bytes, bm: bytes) -> None:
+    """Stores the bitmap for the given png content in the cache."""
+    key = bm_cache_key(png)
+    bm_memory_cache[key] = bm
+    try:
+        BM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # write then rename so an interrupted pack never leaves a partial file in the cache
+        tmp = BM_CACHE_DIR / f"{key}.{os.getpid()}.tmp"
+        tmp.write_bytes(bm)
+        tmp.replace(BM_CACHE_DIR / key)
+    except OSError:
+        pass  # the cache is only an optimization
+
+
+def fast_copy(src: pathlib.Path, dst: pathlib.Path) -> None:
+    """Hard links an already compiled file into the output, copying it if linking is not possible."""
+    with contextlib.suppress(FileNotFoundError):
+        dst.unlink()
+    try:
+        os.link(src, dst)
+    except OSError:  # different filesystem, or no hard link support
+        shutil.copyfile(src, dst)
+
+
+def is_up_to_date(output: pathlib.Path, src: pathlib.Path, newer_than: int = 0) -> bool:
+    """Returns whether output exists and is at least as new as src (and newer_than, in ns)."""
+    try:
+        return output.stat().st_mtime_ns >= max(src.stat().st_mtime_ns, newer_than)
+    except OSError:
+        return False
+
+
+def reuse_previous(src: pathlib.Path, previous: "pathlib.Path | None", dst: pathlib.Path, newer_than: int = 0) -> bool:
+    """Moves the output of the previous packing to dst if it is newer than its source.
+
+    newer_than is an extra timestamp (in ns) the previous output has to be newer than.
+    """
+    if previous is None or not is_up_to_date(previous, src, newer_than):
+        return False
+    try:
+        previous.replace(dst)
+    except OSError:
+        return False
+    return True
+
+
+def write_files(files: "list[tuple[pathlib.Path, bytes]]") -> None:
+    """Writes files, resolving each destination directory only once where the OS allows it.
+
+    Each file is written to a temporary name and renamed into place, so an interrupted write never leaves a partial
+    output that a later repack would reuse, and outputs hard linked by fast_copy never write through to the sources.
+    """
+    # os.replace takes dir_fd arguments wherever os.rename does
+    if os.open not in os.supports_dir_fd or os.rename not in os.supports_dir_fd or not hasattr(os, "O_DIRECTORY"):
+        for path, data in files:
+            tmp = path.with_name(f".{path.name}.tmp")
+            try:
+                tmp.write_bytes(data)
+                tmp.replace(path)
+            except BaseException:
+                tmp.unlink(missing_ok=True)
+                raise
+        return
+
+    by_directory = {}
+    for path, data in files:
+        by_directory.setdefault(path.parent, []).append((path.name, data))
+    for directory, directory_files in by_directory.items():
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for name, data in directory_files:
+                tmp = f".{name}.tmp"
+                try:
+                    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666, dir_fd=dir_fd)
+                    with os.fdopen(fd, "wb") as f:
+                        f.write(data)
+                    os.replace(tmp, name, src_dir_fd=dir_fd, dst_dir_fd=dir_fd)
+                except BaseException:
+                    with contextlib.suppress(FileNotFoundError):
+                        os.unlink(tmp, dir_fd=dir_fd)
+                    raise
+        finally:
+            os.close(dir_fd)
+
+
+def open_png(path: pathlib.Path, png: bytes) -> Image.Image:
+    """Decodes the content of a png file, naming the file in the error if it is not a valid image."""
+    try:
+        img = Image.open(io.BytesIO(png))
+        img.load()
+    except OSError as e:  # PIL would only name the in-memory buffer
+        msg = f"cannot decode image file '{path}'"
+        raise OSError(msg) from e
+    return img
+
+
+def convert_pngs_to_bm(pngs: "list[tuple[pathlib.Path, bytes]]") -> list[bytes]:
+    """Converts (path, content) png files to bitmaps, same-sized images are packed together.
+
+    Module level so that worker processes can use it.
+    """
+    bms = [b""] * len(pngs)
+    by_size = {}
+    for i, (path, png) in enumerate(pngs):
+        img = open_png(path, png)
+        by_size.setdefault(img.size, []).append((i, img))
+    for group in by_size.values():
+        for (i, _), bm in zip(group, convert_frames_to_bm([img for _, img in group]), strict=True):
+            bms[i] = bm
+    return bms
+
+
+def is_worth_parallel(pngs: "list[tuple[pathlib.Path, bytes]]") -> bool:
+    """Returns whether converting the (path, content) png files is enough work to start worker processes for."""
+    pixels = 0
+    for _, png in pngs:
+        # only reads the png header, invalid files are reported by convert_pngs_to_bm
+        with contextlib.suppress(OSError), Image.open(io.BytesIO(png)) as img:
+            pixels += img.width * img.height
+        if pixels >= PARALLEL_MIN_PIXELS:
+            return True
+    return False
+
+
+def compress_frames(frames: "list[tuple[pathlib.Path, pathlib.Path]]") -> None:
+    """Converts (png, bm) frame pairs, spread in batches over all CPU cores when there are enough of them.
+
+    The bitmap cache is only used here, worker processes just convert the frames that are not cached.
+    """
+    pngs = [src.read_bytes() for src, _ in frames]
+    bms = [bm_cache_get(png) for png in pngs]
+    to_convert = [i for i, bm in enumerate(bms) if bm is None]
+    to_convert_pngs = [(frames[i][0], pngs[i]) for i in to_convert]
+
+    workers = os.cpu_count() or 1
+    if workers == 1 or not is_worth_parallel(to_convert_pngs):
+        converted = convert_pngs_to_bm(to_convert_pngs)
+    else:
+        batch_size = -(-len(to_convert_pngs) // workers)
+        batches = [to_convert_pngs[i : i + batch_size] for i in range(0, len(to_convert_pngs), batch_size)]
+        # processes rather than threads: heatshrink2 (as of 0.13.0) holds the GIL while compressing
+        with concurrent.futures.ProcessPoolExecutor() as executor:
+            converted = [bm for batch in executor.map(convert_pngs_to_bm, batches) for bm in batch]
+
+    for i, bm in zip(to_convert, converted, strict=True):
+        bms[i] = bm
+        bm_cache_put(pngs[i], bm)
+    write_files([(dst, bm) for (_, dst), bm in zip(frames, bms, strict=True)])
+
+
 def copy_file_as_lf(src: "pathlib.Path", dst: "pathlib.Path") -> None:
     """Copy file but replace Windows Line Endings with Unix Line Endings."""
-    dst.write_bytes(src.read_bytes().replace(b"\r\n", b"\n"))
-
+    with src.open("rb") as f_src, dst.open("wb") as f_dst:
+        carry = b""
+        while chunk := f_src.read(65536):
+            chunk = carry + chunk
+            # a trailing \r might be the first half of a \r\n split across chunks
+            carry = b"\r" if chunk.endswith(b"\r") else b""
+            f_dst.write(chunk[: len(chunk) - len(carry)].replace(b"\r\n", b"\n"))
+        f_dst.write(carry)
+
+
+def pack_anim(
+    src: pathlib.Path,
+    dst: pathlib.Path,
+    previous: "pathlib.Path | None" = None,
+    pending_frames: "list[tuple[pathlib.Path, pathlib.Path]] | None" = None,
+) -> None:
+    """Packs an anim.
 
-def pack_anim(src: pathlib.Path, dst: pathlib.Path) -> None:
-    """Packs an anim."""
+    Frames that are up to date in previous (the last packed version of this anim) are reused.
+    If pending_frames is given, the frames to compress are added to it instead of being compressed right away.
+    """
     if not (src / "meta.txt").is_file():
         print(f'\033[31mNo meta.txt found in "{src.name}" anim.\033[0m')
         return
-    if not any(re.match(r"frame_\d+\.(png|bm)", file.name) for file in src.iterdir()):
+    if not any(FRAME_NAME_RE.match(file.name) for file in src.iterdir()):
         print(
             f'\033[31mNo frames with the required format found in "{src.name}" anim.\033[0m',
         )
@@ -195,16 +414,31 @@ def pack_anim(src: pathlib.Path, dst: pathlib.Path) -> None:
         convert_and_rename_frames(src, print)
 
     dst.mkdir(parents=True, exist_ok=True)
-    for frame in src.iterdir():
-        if not frame.is_file():
-            continue
-        if frame.name == "meta.txt":
-            copy_file_as_lf(frame, dst / frame.name)
-        elif frame.name.startswith("frame_"):
-            if frame.suffix == ".png":
-                (dst / frame.with_suffix(".bm").name).write_bytes(convert_to_bm(frame))
-            elif frame.suffix == ".bm" and not (dst / frame.name).is_file():
-                shutil.copyfile(frame, dst / frame.name)
+    png_frames = []
+    with os.scandir(src) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            if entry.name == "meta.txt":
+                copy_file_as_lf(pathlib.Path(entry.path), dst / entry.name)
+            elif entry.name.startswith("frame_"):
+                frame = pathlib.Path(entry.path)
+                if frame.suffix == ".png":
+                    png_frames.append(frame)
+                elif frame.suffix == ".bm" and not (dst / frame.name).is_file():
+                    fast_copy(frame, dst / frame.name)
+
+    to_compress = []
+    for frame in png_frames:
+        bm = frame.with_suffix(".bm")
+        if is_up_to_date(bm, frame):
+            fast_copy(bm, dst / bm.name)
+        elif not reuse_previous(frame, previous / bm.name if previous else None, dst / bm.name):
+            to_compress.append((frame, dst / bm.name))
+    if pending_frames is None:
+        compress_frames(to_compress)
+    else:
+        pending_frames.extend(to_compress)
 
 
 def recover_anim(src: pathlib.Path, dst: pathlib.Path) -> None:
@@ -212,7 +446,7 @@ def recover_anim(src: pathlib.Path, dst: pathlib.Path) -> None:
     if not Path.exists(src):
         print(f'\033[31mError: "{src}" not found\033[0m')
         return
-    if not any(re.match(r"frame_\d+.bm", file.name) for file in src.iterdir()):
+    if not any(BM_FRAME_NAME_RE.match(file.name) for file in src.iterdir()):
         print(
             f'\033[31mNo frames with the required format found in "{src.name}" anim.\033[0m',
         )
@@ -225,12 +459,12 @@ def recover_anim(src: pathlib.Path, dst: pathlib.Path) -> None:
     meta = src / "meta.txt"
     if Path.exists(meta):
         shutil.copyfile(meta, dst / meta.name)
-        with Path.open(meta, encoding="utf-8") as f:
-            for line in f:
-                if line.startswith("Width:"):
-                    width = int(line.split(":")[1].strip())
-                elif line.startswith("Height:"):
-                    height = int(line.split(":")[1].strip())
+        meta_data = meta.read_bytes()
+        # searched separately, the keys can be in any order
+        if meta_width := META_WIDTH_RE.search(meta_data):
+            width = int(meta_width.group(1))
+        if meta_height := META_HEIGHT_RE.search(meta_data):
+            height = int(meta_height.group(1))
     else:
         print(f"meta.txt not found, assuming width={width}, height={height}")
 
@@ -240,18 +474,29 @@ def recover_anim(src: pathlib.Path, dst: pathlib.Path) -> None:
             img.save(dst / file.with_suffix(".png").name)
 
 
-def pack_animated_icon(src: pathlib.Path, dst: pathlib.Path) -> None:
-    """Packs an animated ico."""
+def pack_animated_icon(
+    src: pathlib.Path,
+    dst: pathlib.Path,
+    previous: "pathlib.Path | None" = None,
+    pending_frames: "list[tuple[pathlib.Path, pathlib.Path]] | None" = None,
+) -> None:
+    """Packs an animated ico.
+
+    Frames that are up to date in previous (the last packed version of this icon) are reused.
+    If pending_frames is given, the frames to compress are added to it instead of being compressed right away.
+    """
     if not (src / "frame_rate").is_file() and not (src / "meta").is_file():
         return
+    # frames are renumbered, so adding or removing a frame (which updates the directory) invalidates all of them
+    src_mtime_ns = src.stat().st_mtime_ns
     dst.mkdir(parents=True, exist_ok=True)
     frame_count = 0
     frame_rate = None
     size = None
-    files = [file for file in src.iterdir() if file.is_file()]
+    to_compress = []
+    with os.scandir(src) as entries:
+        files = [pathlib.Path(entry.path) for entry in entries if entry.is_file()]
     for frame in sorted(files, key=lambda x: x.name):
-        if not frame.is_file():
-            continue
         if frame.name == "frame_rate":
             frame_rate = int(frame.read_text().strip())
         elif frame.name == "meta":
@@ -260,13 +505,27 @@ def pack_animated_icon(src: pathlib.Path, dst: pathlib.Path) -> None:
             dst_frame = dst / f"frame_{frame_count:02}.bm"
             if frame.suffix == ".png":
                 if not size:
-                    size = Image.open(frame).size
-                dst_frame.write_bytes(convert_to_bm(frame))
+                    # only reads the png header, the frame itself is decoded once when compressing
+                    with Image.open(frame) as img:
+                        size = img.size
+                if is_up_to_date(frame.with_suffix(".bm"), frame):
+                    fast_copy(frame.with_suffix(".bm"), dst_frame)
+                elif not reuse_previous(
+                    frame,
+                    previous / dst_frame.name if previous else None,
+                    dst_frame,
+                    src_mtime_ns,
+                ):
+                    to_compress.append((frame, dst_frame))
                 frame_count += 1
             elif frame.suffix == ".bm":
                 if frame.with_suffix(".png") not in files:
-                    shutil.copyfile(frame, dst_frame)
+                    fast_copy(frame, dst_frame)
                     frame_count += 1
+    if pending_frames is None:
+        compress_frames(to_compress)
+    else:
+        pending_frames.extend(to_compress)
     if size is not None and frame_rate is not None:
         (dst / "meta").write_bytes(struct.pack("<IIII", *size, frame_rate, frame_count))
 
@@ -319,13 +578,15 @@ def recover_animated_icon(src: pathlib.Path, dst: pathlib.Path) -> None:
     (dst / "frame_rate").write_text(str(frame_rate_value))
 
 
-def pack_static_icon(src: pathlib.Path, dst: pathlib.Path) -> None:
-    """Packs a static icon."""
+def pack_static_icon(src: pathlib.Path, dst: pathlib.Path, previous: "pathlib.Path | None" = None) -> None:
+    """Packs a static icon, reusing previous (the last packed version of this icon) if it is up to date."""
     dst.parent.mkdir(parents=True, exist_ok=True)
     if src.suffix == ".png":
-        dst.with_suffix(".bmx").write_bytes(convert_to_bmx(src))
+        if reuse_previous(src, previous.with_suffix(".bmx") if previous else None, dst.with_suffix(".bmx")):
+            return
+        write_files([(dst.with_suffix(".bmx"), convert_to_bmx(src))])
     elif src.suffix == ".bmx" and not dst.is_file():
-        shutil.copyfile(src, dst)
+        fast_copy(src, dst)
 
 
 def recover_static_icon(src: pathlib.Path, dst: pathlib.Path) -> None:
@@ -335,24 +596,57 @@ def recover_static_icon(src: pathlib.Path, dst: pathlib.Path) -> None:
         recover_from_bmx(src).save(dst.with_suffix(".png"))
 
 
+def extract_font_strings(code: "bytes | mmap.mmap") -> "bytes | None":
+    """Returns the escaped string literals of a u8g2 font source, or None if there is no valid font in it.
+
+    The strings are joined with a backslash-newline, which ends any escape sequence and is dropped
+    when decoding, so all of them can be decoded in a single pass.
+    """
+    # the font data is between '") =' after the section name and the next one, if any
+    section = code.find(b' U8G2_FONT_SECTION("')
+    if section == -1:
+        return None
+    section_end = code.find(b' U8G2_FONT_SECTION("', section + 1)
+    if section_end == -1:
+        section_end = len(code)
+    start = code.find(b'") =', section, section_end)
+    if start == -1:
+        return None
+    start += len(b'") =')
+    end = code.find(b'") =', start, section_end)
+    if end == -1:
+        end = section_end
+
+    # the first string can be on the same line as the declaration
+    line_ends = (code.find(b"\n", start, end), code.find(b"\r", start, end))
+    first_line_end = min((i for i in line_ends if i != -1), default=end)
+    strings = [FONT_STRING_RE.fullmatch(code, start, first_line_end)]
+    strings += FONT_STRING_LINE_RE.finditer(code, first_line_end, end)
+    literals = [string.group(1) for string in strings if string]
+    # a literal ending in an unpaired backslash is not valid C, and would escape the separator instead
+    if any((len(literal) - len(literal.rstrip(b"\\"))) % 2 for literal in literals):
+        return None
+    return b"\\\n".join(literals)
+
+
 def pack_font(src: pathlib.Path, dst: pathlib.Path) -> None:
     """Packs a font."""
     dst.parent.mkdir(parents=True, exist_ok=True)
     if src.suffix == ".c":
         try:
-            code = src.read_bytes().split(b' U8G2_FONT_SECTION("')[1].split(b'") =')[1].strip()
-        except IndexError:
+            with src.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as code:
+                escaped = extract_font_strings(code)
+            font = escaped.decode("unicode_escape").encode("latin_1") if escaped is not None else None
+        except ValueError:  # raised by mmap for empty files and by invalid escape sequences
+            font = None
+        if font is None:
             print(f'\033[31mError: "{src.name}" is not a valid font file.\033[0m')
             return
-        font = b""
-        for line in code.splitlines():
-            if line.count(b'"') == 2:
-                font += line[line.find(b'"') + 1 : line.rfind(b'"')].decode("unicode_escape").encode("latin_1")
         font += b"\0"
-        dst.with_suffix(".u8f").write_bytes(font)
+        write_files([(dst.with_suffix(".u8f"), font)])
     elif src.suffix == ".u8f":
         if not dst.is_file():
-            shutil.copyfile(src, dst)
+            fast_copy(src, dst)
 
 
 # recover font is not implemented
@@ -364,10 +658,15 @@ def convert_and_rename_frames(directory: "str | pathlib.Path", logger: typing.Ca
     (requires the image name to contain the frame number)
     """
     already_formatted = True
-    for file in directory.iterdir():
-        if file.is_file() and file.suffix in (".jpg", ".jpeg", ".png") and not re.match(r"frame_\d+.png", file.name):
-            already_formatted = False
-            break
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if (
+                entry.name.endswith((".jpg", ".jpeg", ".png"))
+                and entry.is_file()
+                and not PNG_FRAME_NAME_RE.match(entry.name)
+            ):
+                already_formatted = False
+                break
     if already_formatted:
         logger(f'"{directory.name}" anim is formatted')
         return
@@ -382,10 +681,12 @@ def convert_and_rename_frames(directory: "str | pathlib.Path", logger: typing.Ca
     print()
     index = 1
 
-    for file in sorted(directory.iterdir(), key=lambda x: x.name):
-        if file.is_file() and file.suffix in (".jpg", ".jpeg", ".png"):
+    with os.scandir(directory) as entries:
+        files = sorted((pathlib.Path(entry.path) for entry in entries if entry.is_file()), key=lambda x: x.name)
+    for file in files:
+        if file.suffix in (".jpg", ".jpeg", ".png"):
             filename = file.stem
-            if re.search(r"\d+", filename):
+            if HAS_DIGITS_RE.search(filename):
                 filename = f"frame_{index}.png"
                 index += 1
             else:
@@ -410,12 +711,37 @@ def convert_and_rename_frames_for_all_anims(
             convert_and_rename_frames(anim, logger)
 
 
+def set_aside_packed(packed: pathlib.Path, *, force: bool) -> "pathlib.Path | None":
+    """Removes an existing packed asset pack, returning where it was moved to if it can be reused.
+
+    The pack is moved aside rather than packed over, so that outputs without a source anymore are
+    removed once the previous version is deleted.
+    """
+    if not packed.exists():
+        return None
+    if not packed.is_dir() or packed.is_symlink():
+        packed.unlink()
+        return None
+    if force:
+        shutil.rmtree(packed, ignore_errors=True)
+        return None
+    previous = packed.with_name(f".{packed.name}.previous")
+    shutil.rmtree(previous, ignore_errors=True)
+    packed.rename(previous)
+    return previous
+
+
 def pack_specific(
     asset_pack_path: "str | pathlib.Path",
     output_directory: "str | pathlib.Path",
     logger: typing.Callable,
+    *,
+    force: bool = False,
 ) -> None:
-    """Packs a specific asset pack."""
+    """Packs a specific asset pack.
+
+    Unless force is set, up to date frames and icons from the existing packed version are reused.
+    """
     asset_pack_path = pathlib.Path(asset_pack_path)
     output_directory = pathlib.Path(output_directory)
 
@@ -431,15 +757,14 @@ def pack_specific(
 
     packed = output_directory / asset_pack_path.name
 
-    if packed.exists():
-        try:
-            if packed.is_dir() and not packed.is_symlink():
-                shutil.rmtree(packed, ignore_errors=True)
-            else:
-                packed.unlink()
-        except (OSError, shutil.Error):
-            logger(f"\033[31mError: Failed to remove existing pack: '{packed}'\033[0m")
-            return
+    try:
+        previous = set_aside_packed(packed, force=force)
+    except (OSError, shutil.Error):
+        logger(f"\033[31mError: Failed to remove existing pack: '{packed}'\033[0m")
+        return
+
+    # frames of all anims and icons are compressed together, so worker processes are started at most once per pack
+    pending_frames = []
 
     # packing anims
     if (asset_pack_path / "Anims/manifest.txt").exists():
@@ -447,47 +772,68 @@ def pack_specific(
             parents=True,
             exist_ok=True,
         )  # ensure that the "Anims" directory exists
-        copy_file_as_lf(
-            asset_pack_path / "Anims/manifest.txt",
-            packed / "Anims/manifest.txt",
-        )
         manifest = (asset_pack_path / "Anims/manifest.txt").read_bytes()
+        (packed / "Anims/manifest.txt").write_bytes(manifest.replace(b"\r\n", b"\n"))
 
         # Find all the anims in the manifest
-        for anim in re.finditer(rb"Name: (.*)", manifest):
+        for anim in MANIFEST_NAME_RE.finditer(manifest):
             anim_name = anim.group(1).decode().replace("\\", "/").replace("/", os.sep).replace("\r", "\n").strip()
             logger(
                 f"Compiling anim '\033[3m{anim_name}\033[0m' for '\033[3m{asset_pack_path.name}\033[0m'",
             )
-            pack_anim(asset_pack_path / "Anims" / anim_name, packed / "Anims" / anim_name)
+            pack_anim(
+                asset_pack_path / "Anims" / anim_name,
+                packed / "Anims" / anim_name,
+                previous / "Anims" / anim_name if previous else None,
+                pending_frames,
+            )
 
     # packing icons
     if (asset_pack_path / "Icons").is_dir():
-        for icons in (asset_pack_path / "Icons").iterdir():
-            if not icons.is_dir() or icons.name.startswith("."):
-                continue
-            for icon in icons.iterdir():
-                if icon.name.startswith("."):
-                    continue
-                if icon.is_dir():
+        with os.scandir(asset_pack_path / "Icons") as entries:
+            icon_groups = [entry for entry in entries if entry.is_dir() and not entry.name.startswith(".")]
+        for icons in icon_groups:
+            with os.scandir(icons.path) as entries:
+                icon_entries = [entry for entry in entries if not entry.name.startswith(".")]
+            for entry in icon_entries:
+                icon = pathlib.Path(entry.path)
+                if entry.is_dir():
                     logger(
                         f"Compiling icon for pack '{asset_pack_path.name}': {icons.name}/{icon.name}",
                     )
-                    pack_animated_icon(icon, packed / "Icons" / icons.name / icon.name)
-                elif icon.is_file() and icon.suffix in (".png", ".bmx"):
+                    pack_animated_icon(
+                        icon,
+                        packed / "Icons" / icons.name / icon.name,
+                        previous / "Icons" / icons.name / icon.name if previous else None,
+                        pending_frames,
+                    )
+                elif entry.is_file() and icon.suffix in (".png", ".bmx"):
                     logger(
                         f"Compiling icon for pack '{asset_pack_path.name}': {icons.name}/{icon.name}",
                     )
-                    pack_static_icon(icon, packed / "Icons" / icons.name / icon.name)
+                    pack_static_icon(
+                        icon,
+                        packed / "Icons" / icons.name / icon.name,
+                        previous / "Icons" / icons.name / icon.name if previous else None,
+                    )
+
+    if pending_frames:
+        logger(f"Compressing {len(pending_frames)} frames for pack '{asset_pack_path.name}'")
+        compress_frames(pending_frames)
 
     # packing fonts
     if (asset_pack_path / "Fonts").is_dir():
-        for font in (asset_pack_path / "Fonts").iterdir():
-            if not font.is_file() or font.name.startswith(".") or font.suffix not in (".c", ".u8f"):
+        with os.scandir(asset_pack_path / "Fonts") as entries:
+            fonts = [pathlib.Path(entry.path) for entry in entries if entry.is_file()]
+        for font in fonts:
+            if font.name.startswith(".") or font.suffix not in (".c", ".u8f"):
                 continue
             logger(f"Compiling font for pack '{asset_pack_path.name}': {font.name}")
             pack_font(font, packed / "Fonts" / font.name)
 
+    if previous:
+        shutil.rmtree(previous, ignore_errors=True)
+
     logger(f"\033[32mFinished packing '\033[3m{asset_pack_path.name}\033[23m'\033[0m")
     logger(f"Saved to: '\033[33m{packed}\033[0m'")
 
@@ -569,6 +915,8 @@ def pack_all_asset_packs(
     source_directory: "str | pathlib.Path",
     output_directory: "str | pathlib.Path",
     logger: typing.Callable,
+    *,
+    force: bool = False,
 ) -> None:
     """Packs all asset packs in the source directory."""
     try:
@@ -591,7 +939,7 @@ def pack_all_asset_packs(
         if not source.is_dir() or source.name.startswith(".") or source.name in ("venv", "recovered"):
             continue
 
-        pack_specific(source, output_directory, logger)
+        pack_specific(source, output_directory, logger, force=force)
 
 
 def recover_all_asset_packs(
@@ -633,7 +981,7 @@ def create_asset_pack(
         output_directory = pathlib.Path(output_directory)
 
     # check for illegal characters
-    if not re.match(r"^[a-zA-Z0-9_\- ]+$", asset_pack_name):
+    if not PACK_NAME_RE.match(asset_pack_name):
         logger(f"\033[31mError: '{asset_pack_name}' contains illegal characters\033[0m")
         return
 
@@ -697,21 +1045,25 @@ def main() -> None:
             print(HELP_MESSAGE)
 
         case "pack":
-            if len(sys.argv) == 3:
+            force = "--force" in sys.argv[2:]
+            args = [arg for arg in sys.argv[2:] if arg != "--force"]
+            if len(args) == 1:
                 here = pathlib.Path.cwd()
                 start = time.perf_counter()
 
-                if sys.argv[2] == "all":
+                if args[0] == "all":
                     pack_all_asset_packs(
                         here,
                         here / "asset_packs",
                         logger=print,
+                        force=force,
                     )
                 else:
                     pack_specific(
-                        sys.argv[2],
+                        args[0],
                         pathlib.Path.cwd() / "asset_packs",
                         logger=print,
+                        force=force,
                     )
 
                 end = time.perf_counter()